@@ -14,25 +14,27 @@ def main():
     outdir = args.outdir or os.path.join(os.path.dirname(args.csv_path), "plots_cli")
     os.makedirs(outdir, exist_ok=True)
 
-    def plot_metric(df, y, title, fname):
-        import matplotlib.pyplot as plt
+    # Group once; every metric plots the same per-community series
+    grouped = sorted(df.groupby("community_id"))
+
+    def plot_metric(grouped, y, title, fname):
         plt.figure()
         markers = ['o', 's', '^']  # different point shapes
-        for (i, (cid, g)) in enumerate(sorted(df.groupby("community_id"))):
+        for (i, (cid, g)) in enumerate(grouped):
             plt.plot(g["generation"], g[y], marker=markers[i % len(markers)], label=f"Community {cid}")
         plt.xlabel("Generation (month)")
         plt.ylabel(y.replace("_", " ").title())
         plt.title(title)
         plt.legend()
-        plt.savefig(os.path.join(plots_dir, fname), bbox_inches="tight")
+        plt.savefig(os.path.join(outdir, fname), bbox_inches="tight")
         plt.close()
 
-    plot_metric(df, "population", "Population Over Time", "population.png")
+    plot_metric(grouped, "population", "Population Over Time", "population.png")
     for y in ["stock_wood", "stock_livestock", "stock_stone",
               "deficit_wood", "deficit_livestock", "deficit_stone",
               "trade_wood", "trade_livestock", "trade_stone",
               "weight_wood", "weight_livestock", "weight_stone"]:
-        plot_metric(df, y, y.replace("_", " ").title(), f"{y}.png")
+        plot_metric(grouped, y, y.replace("_", " ").title(), f"{y}.png")
 
     print("Wrote plots to", outdir)
 
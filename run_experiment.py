@@ -34,12 +34,13 @@ def main():
     csv_path = os.path.join(out_dir, "results.csv")
     df.to_csv(csv_path, index=False)
 
-    # Basic plots
-    def plot_metric(df, y, title, fname):
-        import matplotlib.pyplot as plt
+    # Basic plots; group once since every metric plots the same per-community series
+    grouped = sorted(df.groupby("community_id"))
+
+    def plot_metric(grouped, y, title, fname):
         plt.figure()
         markers = ['o', 's', '^']  # different point shapes
-        for (i, (cid, g)) in enumerate(sorted(df.groupby("community_id"))):
+        for (i, (cid, g)) in enumerate(grouped):
             plt.plot(g["generation"], g[y], marker=markers[i % len(markers)], label=f"Community {cid}")
         plt.xlabel("Generation (month)")
         plt.ylabel(y.replace("_", " ").title())
@@ -48,13 +49,13 @@ def main():
         plt.savefig(os.path.join(plots_dir, fname), bbox_inches="tight")
         plt.close()
 
-    plot_metric(df, "population", "Population Over Time", "population.png")
-    plot_metric(df, "stock_wood", "Stock: Wood", "stock_wood.png")
-    plot_metric(df, "stock_livestock", "Stock: Livestock", "stock_livestock.png")
-    plot_metric(df, "stock_stone", "Stock: Stone", "stock_stone.png")
+    plot_metric(grouped, "population", "Population Over Time", "population.png")
+    plot_metric(grouped, "stock_wood", "Stock: Wood", "stock_wood.png")
+    plot_metric(grouped, "stock_livestock", "Stock: Livestock", "stock_livestock.png")
+    plot_metric(grouped, "stock_stone", "Stock: Stone", "stock_stone.png")
 
     for y in ["weight_wood", "weight_livestock", "weight_stone"]:
-        plot_metric(df, y, f"Bartering Weight: {y.split('_')[1].title()}", f"{y}.png")
+        plot_metric(grouped, y, f"Bartering Weight: {y.split('_')[1].title()}", f"{y}.png")
 
     print("Run complete.")
     print("Results CSV:", csv_path)
@@ -1,8 +1,10 @@
 from typing import Final, List
 
-WOOD: Final[str] = "wood"
-LIVESTOCK: Final[str] = "livestock"
-STONE: Final[str] = "stone"
-RESOURCES: Final[List[str]] = [WOOD, LIVESTOCK, STONE]
+# Resources are indices into length-3 arrays (stocks, thresholds, weights, ...)
+WOOD: Final[int] = 0
+LIVESTOCK: Final[int] = 1
+STONE: Final[int] = 2
+RESOURCES: Final[List[int]] = [WOOD, LIVESTOCK, STONE]
+RESOURCE_NAMES: Final[List[str]] = ["wood", "livestock", "stone"]
 
 DAYS_PER_MONTH: Final[int] = 30
\ No newline at end of file
@@ -0,0 +1,72 @@
+from __future__ import annotations
+import numpy as np
+from numba import njit
+
+# Numba kernels for the daily hot path. Resources are fixed at WOOD=0,
+# LIVESTOCK=1, STONE=2, so the resource axis is unrolled by hand.
+
+@njit(cache=True, fastmath=True, nogil=True)
+def gather_kernel(traits, need, avail_mask, eps, base_rate, rand_eps, rand_choice, noise, local_supply, contrib):
+    """Choose a resource and gather for every member of one community.
+
+    Random draws are passed in so results are reproducible from the caller's RNG.
+    Compiled with ``nogil`` so communities can gather on parallel threads.
+    Per-agent contributions are added to ``contrib`` in place; returns the
+    amount gathered per resource (already capped by ``local_supply``).
+    """
+    n = traits.shape[0]
+    u0 = 0.1 * need[0] * avail_mask[0]
+    u1 = 0.1 * need[1] * avail_mask[1]
+    u2 = 0.1 * need[2] * avail_mask[2]
+
+    choices = np.empty(n, dtype=np.int32)
+    amounts = np.empty(n, dtype=np.float64)
+    d0 = 0.0
+    d1 = 0.0
+    d2 = 0.0
+    for i in range(n):
+        # Skill-modulated utility with epsilon-greedy exploration
+        v0 = traits[i, 0] * u0
+        v1 = traits[i, 1] * u1
+        v2 = traits[i, 2] * u2
+        if rand_eps[i] < eps or v0 + v1 + v2 <= 0.0:
+            r = rand_choice[i]
+        else:
+            r = 0
+            best = v0
+            if v1 > best:
+                r = 1
+                best = v1
+            if v2 > best:
+                r = 2
+        amount = base_rate * (traits[i, r] / 10.0) * noise[i]
+        choices[i] = r
+        amounts[i] = amount
+        if r == 0:
+            d0 += amount
+        elif r == 1:
+            d1 += amount
+        else:
+            d2 += amount
+
+    # Cap total demand per resource by local supply; agents share shortfalls pro rata
+    g0 = min(d0, local_supply[0])
+    g1 = min(d1, local_supply[1])
+    g2 = min(d2, local_supply[2])
+    s0 = g0 / d0 if d0 > 0.0 else 0.0
+    s1 = g1 / d1 if d1 > 0.0 else 0.0
+    s2 = g2 / d2 if d2 > 0.0 else 0.0
+    for i in range(n):
+        r = choices[i]
+        if r == 0:
+            contrib[i, 0] += amounts[i] * s0
+        elif r == 1:
+            contrib[i, 1] += amounts[i] * s1
+        else:
+            contrib[i, 2] += amounts[i] * s2
+
+    gathered = np.empty(3, dtype=np.float64)
+    gathered[0] = g0
+    gathered[1] = g1
+    gathered[2] = g2
+    return gathered
\ No newline at end of file
@@ -1,19 +1,19 @@
 from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from typing import Dict, List, Tuple
-import math
 import random
 import time
 
 import numpy as np
 import pandas as pd
 from mesa import Model
-from mesa.time import RandomActivation
 
-from .constants import RESOURCES, WOOD, LIVESTOCK, STONE, DAYS_PER_MONTH
+from .constants import RESOURCES, RESOURCE_NAMES, WOOD, LIVESTOCK, STONE, DAYS_PER_MONTH
 from .agents import GathererAgent, Traits
+from .kernels import gather_kernel
 from .trade import trade_pair, compute_surplus_deficit
-from .utils import normalize_weights, zeros_like, dict_min_key, clamp, dirichlet_perturb
+from .utils import normalize_weights, zeros_like, dict_min_key, clamp, dirichlet_alpha, dirichlet_rows
 
 # ----------------------------- Configs -----------------------------
 
@@ -34,17 +34,17 @@ class CommunityConfig:
     regen_none: float = 0.0
 
     # Map resource -> which endowment type for this community
-    endowment: Dict[str, str] = field(default_factory=lambda: {
+    endowment: Dict[int, str] = field(default_factory=lambda: {
         WOOD: 'abundant', LIVESTOCK: 'none', STONE: 'scarce'
     })
 
     # Monthly thresholds required to be considered "thriving"
-    thresholds: Dict[str, float] = field(default_factory=lambda: {
+    thresholds: Dict[int, float] = field(default_factory=lambda: {
         WOOD: 400.0, LIVESTOCK: 400.0, STONE: 400.0
     })
 
     # Initial bartering weights (relative value importance; will be normalized)
-    bartering_weights: Dict[str, float] = field(default_factory=lambda: {
+    bartering_weights: Dict[int, float] = field(default_factory=lambda: {
         WOOD: 1.0, LIVESTOCK: 1.0, STONE: 1.0
     })
 
@@ -53,6 +53,8 @@ class SimulationConfig:
     generations: int = 24
     days_per_month: int = DAYS_PER_MONTH
     base_gather_rate: float = 10.0  # units/day at skill=10
+    exploration_eps: float = 0.05  # epsilon-greedy chance of gathering a random resource
+    parallel_gather_min_agents: int = 3000  # below this total population, thread dispatch costs more than it saves
     seed: int | None = None
 
     # Mortality
@@ -74,62 +76,87 @@ class CommunityState:
         self.id = config.id
         self.name = config.name
 
+        # All per-resource state is a length-3 array indexed by WOOD/LIVESTOCK/STONE
+
         # stocks: accumulated resources held by the community
-        self.stocks: Dict[str, float] = {r: 0.0 for r in RESOURCES}
+        self.stocks = np.zeros(len(RESOURCES))
 
         # local supply: available to gather today (regenerates daily up to a cap)
-        self.local_supply: Dict[str, float] = {}
-        self.local_caps: Dict[str, float] = {}
-        self.local_regen: Dict[str, float] = {}
-
-        for r in RESOURCES:
-            endow = config.endowment[r]
-            cap = getattr(config, f"cap_{endow}")
-            regen = getattr(config, f"regen_{endow}")
-            self.local_supply[r] = cap * 0.5  # start at half capacity
-            self.local_caps[r] = cap
-            self.local_regen[r] = regen
+        endow = [config.endowment[r] for r in RESOURCES]
+        self.local_caps = np.array([getattr(config, f"cap_{e}") for e in endow], dtype=float)
+        self.local_regen = np.array([getattr(config, f"regen_{e}") for e in endow], dtype=float)
+        self.local_supply = self.local_caps * 0.5  # start at half capacity
 
         # thresholds per month
-        self.thresholds = dict(config.thresholds)
+        self.thresholds = np.array([config.thresholds[r] for r in RESOURCES], dtype=float)
 
         # bartering weights normalized
-        self.barter_weights = normalize_weights(dict(config.bartering_weights))
+        weights = np.array([config.bartering_weights[r] for r in RESOURCES], dtype=float)
+        self.barter_weights = normalize_weights(weights)
+
+        # population index; agents are registered with the Mesa model but not scheduled
+        self.agents_by_id: Dict[int, GathererAgent] = {}
+
+        # Per-agent state as Structure-of-Arrays; rows follow agents_by_id insertion order
+        self.traits_arr = np.empty((0, len(RESOURCES)), dtype=np.float32)
+        self.contrib_arr = np.empty((0, len(RESOURCES)), dtype=np.float32)
 
-        # population agents list will be managed by Mesa scheduler
-        self.agent_ids: List[int] = []
+        # Gathering incentives shared by all members, refreshed once per day
+        self.need = np.zeros(len(RESOURCES))
+        self.avail_mask = np.ones(len(RESOURCES))
+
+        # Random draws for the month's gathering, shape (days, members); see TradeModel._draw_gather_randomness
+        self.explore_draws = np.empty((0, 0))
+        self.choice_draws = np.empty((0, 0), dtype=np.int64)
+        self.noise_draws = np.empty((0, 0))
 
         # trade tracking within a generation
-        self.trade_log = {r: 0.0 for r in RESOURCES}
+        self.trade_log = np.zeros(len(RESOURCES))
         self.births = 0
         self.deaths = 0
 
+    # --- membership ---
+    def add_members(self, agents: List[GathererAgent], traits: np.ndarray):
+        """Append agents with their (n, 3) traits block; arrays grow once per call."""
+        for agent in agents:
+            self.agents_by_id[agent.unique_id] = agent
+        self.traits_arr = np.vstack([self.traits_arr, traits])
+        self.contrib_arr = np.vstack([self.contrib_arr, np.zeros((len(agents), len(RESOURCES)), dtype=np.float32)])
+
+    def remove_members(self, rows) -> List[GathererAgent]:
+        """Drop the given rows from the member arrays; returns the removed agents."""
+        members = list(self.agents_by_id.values())
+        removed = [self.agents_by_id.pop(members[i].unique_id) for i in rows]
+        keep = np.ones(len(members), dtype=bool)
+        keep[rows] = False
+        self.traits_arr = self.traits_arr[keep]
+        self.contrib_arr = self.contrib_arr[keep]
+        return removed
+
     # --- mechanics ---
-    def consume_local_supply(self, resource: str, amount: float) -> float:
-        take = min(self.local_supply[resource], amount)
-        self.local_supply[resource] -= take
-        return take
+    def update_daily_need(self):
+        # Need score: community's bartering weights mixed with real-time deficit
+        deficit_ratio = np.maximum(0.0, (self.thresholds - self.stocks) / np.maximum(1.0, self.thresholds))
+        self.need = 0.5 * self.barter_weights + 0.5 * deficit_ratio
+        # Exhausted local supply is disincentivized
+        self.avail_mask = np.where(self.local_supply > 1e-6, 1.0, 0.1)
 
     def regenerate_local_supply(self):
-        for r in RESOURCES:
-            self.local_supply[r] = min(self.local_supply[r] + self.local_regen[r], self.local_caps[r])
+        np.minimum(self.local_supply + self.local_regen, self.local_caps, out=self.local_supply)
 
-    def lacking_resource(self) -> str:
+    def lacking_resource(self) -> int:
         # Choose the resource with lowest stock/threshold ratio
-        ratios = {r: (self.stocks[r] / max(1.0, self.thresholds[r])) for r in RESOURCES}
-        return min(ratios, key=ratios.get)
+        return int(np.argmin(self.stocks / np.maximum(1.0, self.thresholds)))
 
-    # Learning: adjust weights toward needs; then inject small Dirichlet perturbation
-    def update_barter_weights(self, learning_rate: float, alpha_scale: float):
+    # Learning: adjust weights toward needs; the model then injects a small Dirichlet
+    # perturbation for all communities at once (see TradeModel._perturb_barter_weights)
+    def update_barter_weights(self, learning_rate: float):
         _, deficits = compute_surplus_deficit(self.stocks, self.thresholds)
         # Move weights toward deficit proportions
-        total_def = sum(deficits.values())
+        total_def = deficits.sum()
         if total_def > 0:
-            desired = {r: deficits[r] / total_def for r in RESOURCES}
-            for r in RESOURCES:
-                self.barter_weights[r] = (1 - learning_rate) * self.barter_weights[r] + learning_rate * desired[r]
-        # Regularize via Dirichlet noise (keeps sum=1, positivity)
-        self.barter_weights = normalize_weights(dirichlet_perturb(self.barter_weights, alpha_scale=alpha_scale))
+            desired = deficits / total_def
+            self.barter_weights = (1 - learning_rate) * self.barter_weights + learning_rate * desired
 
 # ----------------------------- Model -----------------------------
 
@@ -141,44 +168,92 @@ class TradeModel(Model):
             random.seed(config.seed)
             np.random.seed(config.seed)
 
-        self.schedule = RandomActivation(self)
         self.communities: Dict[int, CommunityState] = {}
         self.agent_counter = 0
         self.generation = 0
+        self.day_of_month = 0
+
+        # Gathering randomness is drawn once per month from this generator
+        self.rng = np.random.default_rng(config.seed)
+        # Thread pool for parallel gathering; created on first use, released by close()
+        self._gather_pool: ThreadPoolExecutor | None = None
 
         # Create communities
         for cc in community_configs:
             c = CommunityState(cc)
             self.communities[c.id] = c
-            # Spawn agents
-            for _ in range(cc.initial_population):
-                self._spawn_agent(c)
+            # Spawn the initial population in one batch
+            self._spawn_agents(c, Traits.random(cc.initial_population))
 
     # ---------------- helpers ----------------
 
-    def _spawn_agent(self, community: CommunityState, traits: Traits | None = None):
-        if traits is None:
-            traits = Traits.random()
-        self.agent_counter += 1
-        a = GathererAgent(self.agent_counter, self, community.id, traits)
-        self.schedule.add(a)
-        community.agent_ids.append(a.unique_id)
-
-    def _remove_agent(self, unique_id: int, community: CommunityState):
-        agent = next((ag for ag in self.schedule.agents if ag.unique_id == unique_id), None)
-        if agent is not None:
-            self.schedule.remove(agent)
-        if unique_id in community.agent_ids:
-            community.agent_ids.remove(unique_id)
+    def _spawn_agents(self, community: CommunityState, traits: np.ndarray):
+        """Create one agent per row of an (n, 3) traits block."""
+        agents = []
+        for row in traits:
+            self.agent_counter += 1
+            agents.append(GathererAgent(self.agent_counter, self, community.id, row))
+        community.add_members(agents, traits)
+
+    def _remove_agents(self, community: CommunityState, rows):
+        for agent in community.remove_members(rows):
+            agent.remove()
 
     # ---------------- daily loop ----------------
 
+    def _draw_gather_randomness(self):
+        """Pre-draw gathering randomness as (days, members) blocks, one per draw type.
+
+        Blocks are redrawn at the start of each month, and for any community whose
+        membership changed since its last draw (e.g. demography ran mid-month).
+        """
+        days = self.config.days_per_month
+        for c in self.communities.values():
+            n = len(c.agents_by_id)
+            if self.day_of_month != 0 and c.noise_draws.shape == (days, n):
+                continue
+            c.explore_draws = self.rng.random((days, n))
+            c.choice_draws = self.rng.integers(0, len(RESOURCES), (days, n))
+            c.noise_draws = self.rng.uniform(0.9, 1.1, (days, n))
+
+    def _gather(self, c: CommunityState):
+        """Daily gathering for every member of a community (see ``gather_kernel``).
+
+        Touches only this community's state, so communities can gather concurrently.
+        """
+        c.update_daily_need()
+        n = len(c.agents_by_id)
+        if n == 0:
+            return
+        # The kernel has no bounds checks; refuse stale draw blocks
+        if c.noise_draws.shape != (self.config.days_per_month, n) or c.traits_arr.shape[0] != n:
+            raise ValueError(f"gather draws for community {c.id} do not match its {n} members")
+        day = self.day_of_month
+        gathered = gather_kernel(
+            c.traits_arr, c.need, c.avail_mask,
+            self.config.exploration_eps, self.config.base_gather_rate,
+            c.explore_draws[day], c.choice_draws[day], c.noise_draws[day],
+            c.local_supply, c.contrib_arr,
+        )
+        c.local_supply -= gathered
+        c.stocks += gathered
+
     def step_day(self):
-        # Agents gather
-        self.schedule.step()
+        self._draw_gather_randomness()
+        # Agents gather; communities are independent within a day (trade is monthly)
+        communities = self.communities.values()
+        if sum(len(c.agents_by_id) for c in communities) >= self.config.parallel_gather_min_agents:
+            if self._gather_pool is None:
+                self._gather_pool = ThreadPoolExecutor(max_workers=max(1, len(self.communities)))
+            for _ in self._gather_pool.map(self._gather, communities):
+                pass
+        else:
+            for c in communities:
+                self._gather(c)
         # Regenerate supplies
         for c in self.communities.values():
             c.regenerate_local_supply()
+        self.day_of_month = (self.day_of_month + 1) % self.config.days_per_month
 
     # ---------------- monthly logic ----------------
 
@@ -190,53 +265,97 @@ class TradeModel(Model):
                 b = self.communities[ids[j]]
                 delta_a = trade_pair(a, b)
                 # track both sides
-                for r in RESOURCES:
-                    a.trade_log[r] += delta_a[r]
-                    b.trade_log[r] -= delta_a[r]
+                a.trade_log += delta_a
+                b.trade_log -= delta_a
 
     def _evaluate_and_demography(self):
         """Apply survival evaluation and reproduction per community."""
         for c in self.communities.values():
+            # Score members by contribution to the lacking resource
+            contrib = c.contrib_arr[:, c.lacking_resource()]
+            pop = len(contrib)
+
             # Mortality proportional to total normalized deficit
             _, deficit = compute_surplus_deficit(c.stocks, c.thresholds)
-            deficit_ratio = sum(deficit.values()) / max(1.0, sum(c.thresholds.values()))
-            pop = len(c.agent_ids)
-            to_remove = int(math.floor(self.config.mortality_scale * deficit_ratio * pop))
-            if to_remove > 0 and pop > 0:
+            deficit_ratio = deficit.sum() / max(1.0, c.thresholds.sum())
+            if deficit_ratio <= 0 or pop == 0:
+                to_remove = 0
+            else:
+                # Truncation equals floor for the non-negative product
+                to_remove = int(self.config.mortality_scale * deficit_ratio * pop)
+            k = min(to_remove, pop)
+
+            # One partition keeps casualties and parents disjoint even under ties:
+            # the k worst contributors die, the top two reproduce if they survive
+            if pop > 0:
+                part = np.argpartition(contrib, (max(k - 1, 0), max(pop - 2, 0)))
+            if pop - k >= 2:
+                # Read parents' traits before deaths renumber rows
+                parents = c.traits_arr[part[-2:]]
+
+            if to_remove > 0:
                 # Remove the worst contributors
-                agents = [ag for ag in self.schedule.agents if isinstance(ag, GathererAgent) and ag.community_id == c.id]
-                # Score by contribution to lacking resource
-                lacking = c.lacking_resource()
-                ranked = sorted(agents, key=lambda ag: ag.monthly_contribution.get(lacking, 0.0))
-                for ag in ranked[:to_remove]:
-                    self._remove_agent(ag.unique_id, c)
-                c.deaths += to_remove
-
-            # Reproduction: pick top two contributors to lacking resource
-            agents = [ag for ag in self.schedule.agents if isinstance(ag, GathererAgent) and ag.community_id == c.id]
-            if len(agents) >= 2:
-                lacking = c.lacking_resource()
-                ranked = sorted(agents, key=lambda ag: ag.monthly_contribution.get(lacking, 0.0), reverse=True)
-                p1, p2 = ranked[0], ranked[1]
-                child_traits = Traits.from_parents(p1.traits, p2.traits, sigma=self.config.trait_mutation_sigma)
-                for _ in range(self.config.offspring_per_generation):
-                    self._spawn_agent(c, child_traits)
-                    c.births += 1
+                self._remove_agents(c, part[:k])
+                c.deaths += k
+
+            # Reproduction
+            if len(c.agents_by_id) >= 2:
+                child_traits = Traits.from_parents(parents[0], parents[1], sigma=self.config.trait_mutation_sigma)
+                n_children = self.config.offspring_per_generation
+                self._spawn_agents(c, np.repeat(child_traits[None, :], n_children, axis=0))
+                c.births += n_children
 
             # Weights learning
-            c.update_barter_weights(self.config.weight_learning_rate, self.config.weight_dirichlet_alpha_scale)
+            c.update_barter_weights(self.config.weight_learning_rate)
+
+            # Reset monthly contribution tracking in place
+            c.contrib_arr.fill(0.0)
+
+        self._perturb_barter_weights()
 
-            # Reset agent monthly tracking
-            for ag in self.schedule.agents:
-                if isinstance(ag, GathererAgent) and ag.community_id == c.id:
-                    ag.reset_monthly_tracking()
+    def _perturb_barter_weights(self):
+        """Regularize every community's weights via Dirichlet noise (keeps sum=1, positivity)."""
+        communities = list(self.communities.values())
+        if not communities:
+            return
+        alphas = np.stack([dirichlet_alpha(c.barter_weights, self.config.weight_dirichlet_alpha_scale)
+                           for c in communities])
+        for c, sample in zip(communities, dirichlet_rows(alphas)):
+            c.barter_weights = normalize_weights(sample)
 
     # ---------------- public API ----------------
 
+    def close(self):
+        """Shut down the gathering thread pool, if one was started."""
+        if self._gather_pool is not None:
+            self._gather_pool.shutdown()
+            self._gather_pool = None
+
+    def __enter__(self) -> TradeModel:
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
     def run(self, generations: int | None = None) -> pd.DataFrame:
         if generations is None:
             generations = self.config.generations
-        records = []
+        # Preallocated log columns, one row per community per generation
+        n_rows = generations * len(self.communities)
+        generation_col = np.empty(n_rows, dtype=np.int32)
+        timestamp_col = np.empty(n_rows)
+        id_col = np.empty(n_rows, dtype=np.int32)
+        name_col = np.empty(n_rows, dtype=object)
+        population_col = np.empty(n_rows, dtype=np.int32)
+        births_col = np.empty(n_rows, dtype=np.int32)
+        deaths_col = np.empty(n_rows, dtype=np.int32)
+        # Per-resource metrics, one column per resource
+        stock_cols = np.empty((n_rows, len(RESOURCES)))
+        deficit_cols = np.empty((n_rows, len(RESOURCES)))
+        trade_cols = np.empty((n_rows, len(RESOURCES)))
+        weight_cols = np.empty((n_rows, len(RESOURCES)))
+
+        idx = 0
         for g in range(generations):
             self.generation = g + 1
             # Run days
@@ -249,34 +368,38 @@ class TradeModel(Model):
             # Log
             ts = time.time()
             for c in self.communities.values():
-                surplus, deficit = compute_surplus_deficit(c.stocks, c.thresholds)
-                rec = {
-                    "generation": self.generation,
-                    "timestamp": ts,
-                    "community_id": c.id,
-                    "community_name": c.name,
-                    "population": len(c.agent_ids),
-                    "stock_wood": c.stocks[WOOD],
-                    "stock_livestock": c.stocks[LIVESTOCK],
-                    "stock_stone": c.stocks[STONE],
-                    "deficit_wood": deficit[WOOD],
-                    "deficit_livestock": deficit[LIVESTOCK],
-                    "deficit_stone": deficit[STONE],
-                    "trade_wood": c.trade_log[WOOD],
-                    "trade_livestock": c.trade_log[LIVESTOCK],
-                    "trade_stone": c.trade_log[STONE],
-                    "weight_wood": c.barter_weights[WOOD],
-                    "weight_livestock": c.barter_weights[LIVESTOCK],
-                    "weight_stone": c.barter_weights[STONE],
-                    "births": c.births,
-                    "deaths": c.deaths,
-                }
-                records.append(rec)
+                _, deficit = compute_surplus_deficit(c.stocks, c.thresholds)
+                generation_col[idx] = self.generation
+                timestamp_col[idx] = ts
+                id_col[idx] = c.id
+                name_col[idx] = c.name
+                population_col[idx] = len(c.agents_by_id)
+                stock_cols[idx] = c.stocks
+                deficit_cols[idx] = deficit
+                trade_cols[idx] = c.trade_log
+                weight_cols[idx] = c.barter_weights
+                births_col[idx] = c.births
+                deaths_col[idx] = c.deaths
+                idx += 1
                 # Reset trade counters for next month
-                c.trade_log = {r: 0.0 for r in RESOURCES}
+                c.trade_log.fill(0.0)
                 c.births = 0
                 c.deaths = 0
-        return pd.DataFrame.from_records(records)
+
+        cols = {
+            "generation": generation_col,
+            "timestamp": timestamp_col,
+            "community_id": id_col,
+            "community_name": name_col,
+            "population": population_col,
+        }
+        for prefix, values in (("stock", stock_cols), ("deficit", deficit_cols),
+                               ("trade", trade_cols), ("weight", weight_cols)):
+            for r in RESOURCES:
+                cols[f"{prefix}_{RESOURCE_NAMES[r]}"] = values[:, r]
+        cols["births"] = births_col
+        cols["deaths"] = deaths_col
+        return pd.DataFrame(cols)
 
 # ----------------------------- Factory -----------------------------
 
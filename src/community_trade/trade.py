@@ -1,80 +1,90 @@
 from __future__ import annotations
-from typing import Dict, Tuple
-from .constants import RESOURCES
-from .utils import add_dicts, clip_nonnegative
-
-def average_price(a_weights: Dict[str, float], b_weights: Dict[str, float]) -> Dict[str, float]:
-    return {r: 0.5 * (a_weights[r] + b_weights[r]) for r in RESOURCES}
-
-def compute_surplus_deficit(stocks: Dict[str, float], thresholds: Dict[str, float]) -> Tuple[Dict[str, float], Dict[str, float]]:
-    surplus = {}
-    deficit = {}
-    for r in RESOURCES:
-        s = stocks[r] - thresholds[r]
-        if s > 0:
-            surplus[r] = s
-            deficit[r] = 0.0
-        else:
-            surplus[r] = 0.0
-            deficit[r] = -s
+from typing import Tuple
+import numpy as np
+from numba import njit
+
+# Each round exhausts a surplus or fills a deficit, and a resource can only be
+# bought or sold by 'a' (never both), so barter over 3 resources settles in 3 rounds
+MAX_TRADE_ROUNDS = 3
+
+def compute_surplus_deficit(stocks: np.ndarray, thresholds: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    diff = stocks - thresholds
+    surplus = np.maximum(diff, 0.0)
+    deficit = np.maximum(-diff, 0.0)
     return surplus, deficit
 
-def trade_pair(a, b) -> Dict[str, float]:
+def trade_pair(a, b) -> np.ndarray:
     """Execute barter between community a and b.
     Returns trade volumes aggregated by resource (positive means net inflow to 'a', negative outflow).
     Symmetric opposite will be applied to 'b' by caller.
     """
-    # Compute pre-trade surplus/deficit
-    a_surplus, a_deficit = compute_surplus_deficit(a.stocks, a.thresholds)
-    b_surplus, b_deficit = compute_surplus_deficit(b.stocks, b.thresholds)
-
-    prices = average_price(a.barter_weights, b.barter_weights)
-
-    trade_log_a = {r: 0.0 for r in RESOURCES}
-
-    progress = True
-    while progress:
-        progress = False
-        # Find a needed resource ra that b can supply, and a resource rb that a can give which b needs
-        ra_candidates = [r for r in RESOURCES if a_deficit[r] > 1e-9 and b_surplus[r] > 1e-9]
-        rb_candidates = [r for r in RESOURCES if b_deficit[r] > 1e-9 and a_surplus[r] > 1e-9]
-        if not ra_candidates or not rb_candidates:
+    return _trade_pair_3(a.stocks, a.thresholds, a.barter_weights, b.stocks, b.thresholds, b.barter_weights)
+
+@njit(cache=True, fastmath=True, boundscheck=False)
+def _trade_pair_3(a_stocks, a_thresh, a_w, b_stocks, b_thresh, b_w):
+    """Greedy barter specialized to the three fixed resources; stocks are updated in place."""
+    # Signed surplus (>0) / deficit (<0) per resource; only the two traded
+    # entries change per round, so they are patched in place
+    a_diff = a_stocks - a_thresh
+    b_diff = b_stocks - b_thresh
+
+    prices = 0.5 * (a_w + b_w)  # mean of both communities' weights
+
+    delta_a = np.zeros(3)
+
+    for _ in range(MAX_TRADE_ROUNDS):
+        # Find a needed resource ra that b can supply, most valuable to A (weight * deficit)
+        ra = -1
+        va = 0.0
+        if a_diff[0] < -1e-9 and b_diff[0] > 1e-9:
+            ra = 0
+            va = -a_w[0] * a_diff[0]
+        if a_diff[1] < -1e-9 and b_diff[1] > 1e-9 and (ra < 0 or -a_w[1] * a_diff[1] > va):
+            ra = 1
+            va = -a_w[1] * a_diff[1]
+        if a_diff[2] < -1e-9 and b_diff[2] > 1e-9 and (ra < 0 or -a_w[2] * a_diff[2] > va):
+            ra = 2
+
+        # ... and a resource rb that a can give which b needs, most valuable to B
+        rb = -1
+        vb = 0.0
+        if b_diff[0] < -1e-9 and a_diff[0] > 1e-9:
+            rb = 0
+            vb = -b_w[0] * b_diff[0]
+        if b_diff[1] < -1e-9 and a_diff[1] > 1e-9 and (rb < 0 or -b_w[1] * b_diff[1] > vb):
+            rb = 1
+            vb = -b_w[1] * b_diff[1]
+        if b_diff[2] < -1e-9 and a_diff[2] > 1e-9 and (rb < 0 or -b_w[2] * b_diff[2] > vb):
+            rb = 2
+
+        if ra < 0 or rb < 0:
             break
 
-        # Greedy pair: pick the most valuable to A and B respectively
-        # Value by their own weights scaled by deficit
-        ra = max(ra_candidates, key=lambda r: a.barter_weights[r] * a_deficit[r])
-        rb = max(rb_candidates, key=lambda r: b.barter_weights[r] * b_deficit[r])
-
         p_ra = prices[ra]
         p_rb = prices[rb]
+        if p_ra <= 0.0:
+            break
 
-        # Max feasible amount of ra (from b to a)
-        x_cap_b = b_surplus[ra]
-        # Limited by a's ability to pay in rb: y <= a_surplus[rb]; and y = x * p_ra / p_rb
-        x_cap_a_pay = a_surplus[rb] * (p_rb / p_ra) if p_ra > 0 else 0.0
-        # Also don't exceed a's need and b's need
-        x_cap_a_need = a_deficit[ra]
-        x_cap_b_need = b_deficit[rb] * (p_rb / p_ra) if p_ra > 0 else 0.0
-
-        x = min(x_cap_b, x_cap_a_pay, x_cap_a_need, x_cap_b_need)
+        # Max feasible amount of ra (from b to a): b's surplus, a's ability to pay
+        # in rb (y = x * p_ra / p_rb), a's need and b's need
+        x = min(b_diff[ra], a_diff[rb] * (p_rb / p_ra), -a_diff[ra], -b_diff[rb] * (p_rb / p_ra))
         if x <= 1e-9:
             break
 
         y = x * (p_ra / p_rb)  # amount of rb from a to b
 
         # Apply the trade
-        a.stocks[ra] += x
-        a.stocks[rb] -= y
-        b.stocks[ra] -= x
-        b.stocks[rb] += y
-
-        a_surplus, a_deficit = compute_surplus_deficit(a.stocks, a.thresholds)
-        b_surplus, b_deficit = compute_surplus_deficit(b.stocks, b.thresholds)
+        a_stocks[ra] += x
+        a_stocks[rb] -= y
+        b_stocks[ra] -= x
+        b_stocks[rb] += y
 
-        trade_log_a[ra] += x
-        trade_log_a[rb] -= y
+        a_diff[ra] += x
+        a_diff[rb] -= y
+        b_diff[ra] -= x
+        b_diff[rb] += y
 
-        progress = True
+        delta_a[ra] += x
+        delta_a[rb] -= y
 
-    return trade_log_a
\ No newline at end of file
+    return delta_a
\ No newline at end of file
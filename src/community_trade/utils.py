@@ -7,13 +7,13 @@ import numpy as np
 def clamp(x: float, lo: float, hi: float) -> float:
     return max(lo, min(hi, x))
 
-def normalize_weights(w: Dict[str, float]) -> Dict[str, float]:
-    s = sum(max(0.0, v) for v in w.values())
+def normalize_weights(w: np.ndarray) -> np.ndarray:
+    a = np.maximum(w, 0.0)
+    s = a.sum()
     if s <= 0:
         # fallback to uniform
-        n = len(w)
-        return {k: 1.0 / n for k in w.keys()}
-    return {k: max(0.0, v) / s for k, v in w.items()}
+        return np.full(len(a), 1.0 / len(a))
+    return a / s
 
 def softmax_dict(d: Dict[str, float], temperature: float = 1.0) -> Dict[str, float]:
     xs = np.array(list(d.values()), dtype=float) / max(1e-9, temperature)
@@ -57,10 +57,13 @@ def as_tuple(d: Dict[str, float], order: List[str]) -> tuple:
 def gaussian_mutation(value: float, sigma: float, lo: float, hi: float) -> float:
     return clamp(value + random.gauss(0.0, sigma), lo, hi)
 
-def dirichlet_perturb(weights: Dict[str, float], alpha_scale: float = 50.0) -> Dict[str, float]:
-    # Convert to Dirichlet params roughly proportional to existing weights
-    keys = list(weights.keys())
-    base = np.array([max(1e-6, weights[k]) for k in keys], dtype=float)
-    alpha = alpha_scale * base / base.sum()
-    sample = np.random.dirichlet(alpha)
-    return {k: float(v) for k, v in zip(keys, sample)}
\ No newline at end of file
+def dirichlet_alpha(weights: np.ndarray, alpha_scale: float = 50.0) -> np.ndarray:
+    # Dirichlet params roughly proportional to existing weights
+    base = np.maximum(weights, 1e-6)
+    return alpha_scale * base / base.sum()
+
+def dirichlet_rows(alphas: np.ndarray) -> np.ndarray:
+    # One Dirichlet sample per row of alphas; numpy has no batched dirichlet,
+    # but normalized Gamma(alpha, 1) draws are Dirichlet(alpha) distributed
+    g = np.random.gamma(alphas, 1.0)
+    return g / g.sum(axis=1, keepdims=True)
\ No newline at end of file